@@ -23,20 +23,41 @@ class DEXTracker:
         "sushiswap": "0xd9e1cE17f2641f24aE83637ab66a2cca9C378B9F"
     }
     
+    # Lowercased contract addresses for case-insensitive matching
+    DEX_CONTRACTS_LOWER = frozenset(addr.lower() for addr in DEX_CONTRACTS.values())
+    
+    # Common function signatures for swaps
+    SWAP_SIGNATURES = {
+        "0x38ed1739": "swapExactTokensForTokens",
+        "0x7ff36ab5": "swapExactETHForTokens",
+        "0x4a25d94a": "swapTokensForExactETH",
+        "0x18cbafe5": "swapExactTokensForETH",
+        "0x5c11d795": "swapExactTokensForTokensSupportingFeeOnTransferTokens"
+    }
+    
     def __init__(self, eth_client: Optional[EthereumClient] = None):
         """Initialize DEX tracker."""
         self.eth_client = eth_client or EthereumClient()
         self.web3 = self.eth_client.web3
+        
+        # Results of is_dex_transaction by transaction hash; a mined transaction's recipient never changes
+        self._is_dex_cache: Dict[str, bool] = {}
     
     def is_dex_transaction(self, tx_hash: str) -> bool:
         """Check if a transaction is a DEX transaction."""
+        cache_key = tx_hash.lower()
+        if cache_key in self._is_dex_cache:
+            return self._is_dex_cache[cache_key]
+        
         try:
             tx = self.web3.eth.get_transaction(tx_hash)
-            if not tx or not tx.get('to'):
+            if not tx:
                 return False
             
             # Check if the transaction is to a known DEX contract
-            return tx['to'].lower() in [addr.lower() for addr in self.DEX_CONTRACTS.values()]
+            is_dex = bool(tx.get('to')) and tx['to'].lower() in self.DEX_CONTRACTS_LOWER
+            self._is_dex_cache[cache_key] = is_dex
+            return is_dex
         except TransactionNotFound:
             return False
         except Exception as e:
@@ -55,45 +76,43 @@ class DEXTracker:
             if not self.is_dex_transaction(tx_hash):
                 return tx
             
-            # Enhance the transaction with DEX-specific information
-            tx.transaction_type = TransactionType.SWAP
-            tx.notes = f"DEX Swap - {tx.notes}"
-            
-            # Try to decode the input data to get more details about the swap
-            # This is a simplified version and would need to be expanded for production use
-            input_data = tx.raw_data.get('input', '')
-            if input_data and len(input_data) > 10:
-                # The first 10 characters (including '0x') are the function signature
-                function_sig = input_data[:10]
-                
-                # Common function signatures for swaps
-                swap_sigs = {
-                    "0x38ed1739": "swapExactTokensForTokens",
-                    "0x7ff36ab5": "swapExactETHForTokens",
-                    "0x4a25d94a": "swapTokensForExactETH",
-                    "0x18cbafe5": "swapExactTokensForETH",
-                    "0x5c11d795": "swapExactTokensForTokensSupportingFeeOnTransferTokens"
-                }
-                
-                if function_sig in swap_sigs:
-                    tx.notes = f"DEX Swap - {swap_sigs[function_sig]} - {tx.notes}"
-            
-            return tx
+            return self._apply_swap_details(tx)
         except Exception as e:
             print(f"Error tracking DEX transaction: {e}")
             return None
     
+    def _apply_swap_details(self, tx: Transaction) -> Transaction:
+        """Enhance a transaction known to target a DEX contract with swap details."""
+        # Enhance the transaction with DEX-specific information
+        tx.transaction_type = TransactionType.SWAP
+        tx.notes = f"DEX Swap - {tx.notes}"
+        
+        # Try to decode the input data to get more details about the swap
+        # This is a simplified version and would need to be expanded for production use
+        input_data = tx.raw_data.get('input', '')
+        if input_data and len(input_data) > 10:
+            # The first 10 characters (including '0x') are the function signature
+            function_sig = input_data[:10]
+            
+            if function_sig in self.SWAP_SIGNATURES:
+                tx.notes = f"DEX Swap - {self.SWAP_SIGNATURES[function_sig]} - {tx.notes}"
+        
+        return tx
+
     def find_dex_transactions(self, address: str, start_block: int = 0, end_block: int = 99999999) -> List[Transaction]:
         """Find DEX transactions for an address."""
-        # Get all transactions for the address
-        transactions = self.eth_client.get_address_transactions(address, start_block, end_block)
+        # Only top-level transactions can be sent to a DEX router, so skip internal transactions
+        transactions = self.eth_client.get_address_transactions(
+            address, start_block, end_block, include_internal=False
+        )
         
-        # Filter for DEX transactions
+        # Filter for DEX transactions using the recipient already returned by Etherscan
         dex_transactions = []
         for tx in transactions:
-            if self.is_dex_transaction(tx.id):
-                dex_tx = self.track_dex_transaction(tx.id)
+            to_addr = (tx.raw_data.get('to') or '').lower()
+            if to_addr in self.DEX_CONTRACTS_LOWER:
+                dex_tx = self.eth_client.get_transaction(tx.id)
                 if dex_tx:
-                    dex_transactions.append(dex_tx)
+                    dex_transactions.append(self._apply_swap_details(dex_tx))
         
         return dex_transactions
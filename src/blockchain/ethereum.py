@@ -2,25 +2,40 @@
 Ethereum blockchain interface for the crypto transaction tracker.
 """
 import json
-import time
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime
-from typing import List, Dict, Any, Optional
+from typing import Callable, List, Dict, Any, Optional
 import uuid
 
-import requests
+import orjson
 from web3 import Web3
+from web3.exceptions import MethodUnavailable
 
 from src.models.transaction import Transaction, TransactionType, TransactionSource
 from src.config.settings import ETHERSCAN_API_KEY, ETH_NODE_URL, INFURA_PROJECT_ID
+from src.utils.http import create_session
+
+# Wei per ether, for converting on-chain values to float ETH amounts
+_WEI_PER_ETH = 1e18
 
 
 class EthereumClient:
     """Client for interacting with the Ethereum blockchain."""
     
-    def __init__(self, api_key: str = None, node_url: str = None, infura_id: str = None):
+    # Number of blocks whose timestamps are kept in memory
+    BLOCK_TIMESTAMPS_CACHE_SIZE = 4096
+    
+    # Number of blocks whose receipts are kept in memory
+    BLOCK_RECEIPTS_CACHE_SIZE = 32
+    
+    def __init__(self, api_key: str = None, node_url: str = None, infura_id: str = None, store_logs: bool = False):
         """Initialize Ethereum client."""
         self.api_key = api_key or ETHERSCAN_API_KEY
         
+        # Keep full receipt logs in raw_data instead of only their count
+        self.store_logs = store_logs
+        
         # Set up Web3 connection
         if node_url and 'infura.io' in node_url and infura_id:
             self.web3 = Web3(Web3.HTTPProvider(f"{node_url}{infura_id}"))
@@ -33,6 +48,16 @@ class EthereumClient:
             self.web3 = Web3(Web3.HTTPProvider("https://cloudflare-eth.com"))
         
         self.etherscan_base_url = "https://api.etherscan.io/api"
+        self._session = create_session()
+        
+        # Block timestamps never change, so cache recently used ones by block number
+        self._block_timestamps: "OrderedDict[int, int]" = OrderedDict()
+        
+        # Receipts of recently seen blocks, indexed by transaction hash
+        self._block_receipts: "OrderedDict[int, Dict[str, Any]]" = OrderedDict()
+        
+        # Cleared once the node reports it doesn't implement eth_getBlockReceipts
+        self._block_receipts_supported = True
     
     def is_connected(self) -> bool:
         """Check if connected to Ethereum node."""
@@ -42,37 +67,120 @@ class EthereumClient:
         """Get ETH balance for an address."""
         try:
             balance_wei = self.web3.eth.get_balance(address)
-            balance_eth = self.web3.from_wei(balance_wei, 'ether')
-            return float(balance_eth)
+            return balance_wei / _WEI_PER_ETH
         except Exception as e:
             print(f"Error getting ETH balance: {e}")
             return 0.0
     
+    def _block_timestamp(self, block_number: int) -> int:
+        """Get the timestamp of a block, fetching it only once per block."""
+        timestamp = self._block_timestamps.get(block_number)
+        if timestamp is None:
+            timestamp = self.web3.eth.get_block(block_number)['timestamp']
+            self._cache_block_timestamp(block_number, timestamp)
+        else:
+            self._block_timestamps.move_to_end(block_number)
+        return timestamp
+    
+    def _cache_block_timestamp(self, block_number: int, timestamp: int):
+        """Cache a block's timestamp, evicting the least recently used block if full."""
+        self._block_timestamps[block_number] = timestamp
+        if len(self._block_timestamps) > self.BLOCK_TIMESTAMPS_CACHE_SIZE:
+            self._block_timestamps.popitem(last=False)
+    
+    def _transaction_receipt(self, tx: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+        """Get the receipt of a transaction, fetching receipts once per block."""
+        block_number = tx['blockNumber']
+        receipts = self._block_receipts.get(block_number)
+        
+        if receipts is None:
+            if not self._block_receipts_supported:
+                return self.web3.eth.get_transaction_receipt(tx['hash'])
+            
+            try:
+                receipts = self._cache_block_receipts(
+                    block_number, self.web3.eth.get_block_receipts(block_number)
+                )
+            except MethodUnavailable:
+                # Node doesn't support eth_getBlockReceipts, stop asking and fall back to single receipts
+                self._block_receipts_supported = False
+                return self.web3.eth.get_transaction_receipt(tx['hash'])
+            except Exception:
+                # The block's receipts couldn't be fetched this time, fall back to a single receipt
+                return self.web3.eth.get_transaction_receipt(tx['hash'])
+        else:
+            self._block_receipts.move_to_end(block_number)
+        
+        receipt = receipts.get(Web3.to_hex(tx['hash']))
+        if receipt is None:
+            # The block's receipts don't include this transaction, ask for it directly
+            receipt = self.web3.eth.get_transaction_receipt(tx['hash'])
+        
+        return receipt
+    
+    def _cache_block_receipts(self, block_number: int, receipts: List[Dict[str, Any]]) -> Dict[str, Any]:
+        """Index a block's receipts by transaction hash and cache them."""
+        indexed = {Web3.to_hex(receipt['transactionHash']): receipt for receipt in receipts}
+        
+        self._block_receipts[block_number] = indexed
+        if len(self._block_receipts) > self.BLOCK_RECEIPTS_CACHE_SIZE:
+            self._block_receipts.popitem(last=False)
+        
+        return indexed
+    
+    def _load_block(self, block_number: int):
+        """Fetch a block's timestamp and receipts together in a single JSON-RPC batch."""
+        # Without eth_getBlockReceipts the batch would fail, so lookups fetch single receipts instead
+        if not self._block_receipts_supported:
+            return
+        
+        try:
+            with self.web3.batch_requests() as batch:
+                batch.add(self.web3.eth.get_block(block_number))
+                batch.add(self.web3.eth.get_block_receipts(block_number))
+                block, receipts = batch.execute()
+        except MethodUnavailable:
+            self._block_receipts_supported = False
+            return
+        except Exception:
+            # Provider can't batch these calls; they are fetched one by one on demand
+            return
+        
+        self._cache_block_timestamp(block_number, block['timestamp'])
+        self._cache_block_receipts(block_number, receipts)
+    
     def get_transaction(self, tx_hash: str) -> Optional[Transaction]:
         """Get transaction details by hash."""
         try:
             # Get transaction from Web3
             tx = self.web3.eth.get_transaction(tx_hash)
-            receipt = self.web3.eth.get_transaction_receipt(tx_hash)
+            if not tx:
+                return None
             
-            if not tx or not receipt:
+            # Fetch the timestamp and receipts of an unseen block in one round trip
+            block_number = tx['blockNumber']
+            if block_number not in self._block_timestamps and block_number not in self._block_receipts:
+                self._load_block(block_number)
+            
+            receipt = self._transaction_receipt(tx)
+            
+            if not receipt:
                 return None
             
             # Get block timestamp
-            block = self.web3.eth.get_block(tx['blockNumber'])
-            timestamp = datetime.fromtimestamp(block['timestamp'])
+            timestamp = datetime.fromtimestamp(self._block_timestamp(block_number))
             
             # Determine transaction type
             tx_type = TransactionType.TRANSFER
             
             # Calculate value in ETH
-            value_eth = float(self.web3.from_wei(tx['value'], 'ether'))
+            value_eth = tx['value'] / _WEI_PER_ETH
             
             # Calculate gas fee
             gas_price_wei = tx['gasPrice']
             gas_used = receipt['gasUsed']
             gas_fee_wei = gas_price_wei * gas_used
-            gas_fee_eth = float(self.web3.from_wei(gas_fee_wei, 'ether'))
+            gas_fee_eth = gas_fee_wei / _WEI_PER_ETH
             
             # Create transaction object
             transaction = Transaction(
@@ -97,7 +205,9 @@ class EthereumClient:
                     "value": str(tx['value']),
                     "receipt": {
                         "status": receipt['status'],
-                        "logs": [dict(log) for log in receipt['logs']]
+                        "log_count": len(receipt['logs']),
+                        # Web3.to_json turns HexBytes into hex strings so the logs can be persisted
+                        **({"logs": orjson.loads(Web3.to_json(receipt['logs']))} if self.store_logs else {})
                     }
                 }
             )
@@ -107,13 +217,21 @@ class EthereumClient:
             print(f"Error getting transaction: {e}")
             return None
     
-    def get_address_transactions(self, address: str, start_block: int = 0, end_block: int = 99999999) -> List[Transaction]:
-        """Get transactions for an address using Etherscan API."""
+    def _etherscan_request(self, params: Dict[str, Any]) -> Dict[str, Any]:
+        """Make a request to the Etherscan API."""
+        response = self._session.get(self.etherscan_base_url, params=params)
+        return orjson.loads(response.content)
+    
+    def get_address_transactions(self, address: str, start_block: int = 0, end_block: int = 99999999,
+                                 include_internal: bool = True,
+                                 on_batch: Optional[Callable[[List[Transaction]], None]] = None) -> List[Transaction]:
+        """Get transactions for an address using Etherscan API, passing each parsed list to on_batch as it arrives."""
         if not self.api_key:
             print("Etherscan API key not provided")
             return []
         
         transactions = []
+        address_lower = address.lower()
         
         # Get normal transactions
         params = {
@@ -126,21 +244,28 @@ class EthereumClient:
             "apikey": self.api_key
         }
         
+        # Get internal transactions
+        internal_params = dict(params, action="txlistinternal")
+        
+        executor = ThreadPoolExecutor(max_workers=2)
         try:
-            response = requests.get(self.etherscan_base_url, params=params)
-            data = response.json()
+            # Fetch both lists concurrently; two requests stay within Etherscan's 5 req/s limit
+            normal_future = executor.submit(self._etherscan_request, params)
+            internal_future = executor.submit(self._etherscan_request, internal_params) if include_internal else None
             
+            data = normal_future.result()
+            batch = []
             if data["status"] == "1" and data["message"] == "OK":
                 for tx_data in data["result"]:
                     # Create transaction object
                     timestamp = datetime.fromtimestamp(int(tx_data["timeStamp"]))
-                    value_eth = float(self.web3.from_wei(int(tx_data["value"]), 'ether'))
+                    value_eth = int(tx_data["value"]) / _WEI_PER_ETH
                     gas_price_wei = int(tx_data["gasPrice"])
                     gas_used = int(tx_data["gasUsed"])
-                    gas_fee_eth = float(self.web3.from_wei(gas_price_wei * gas_used, 'ether'))
+                    gas_fee_eth = gas_price_wei * gas_used / _WEI_PER_ETH
                     
                     # Determine transaction type
-                    if address.lower() == tx_data["from"].lower():
+                    if address_lower == tx_data["from"].lower():
                         tx_type = TransactionType.WITHDRAWAL
                     else:
                         tx_type = TransactionType.DEPOSIT
@@ -159,24 +284,22 @@ class EthereumClient:
                         raw_data=tx_data
                     )
                     
-                    transactions.append(transaction)
+                    batch.append(transaction)
             
-            # Add a delay to avoid rate limiting
-            time.sleep(0.2)
+            transactions.extend(batch)
+            if on_batch and batch:
+                on_batch(batch)
             
-            # Get internal transactions
-            params["action"] = "txlistinternal"
-            response = requests.get(self.etherscan_base_url, params=params)
-            data = response.json()
-            
-            if data["status"] == "1" and data["message"] == "OK":
-                for tx_data in data["result"]:
+            internal_data = internal_future.result() if internal_future else None
+            batch = []
+            if internal_data and internal_data["status"] == "1" and internal_data["message"] == "OK":
+                for tx_data in internal_data["result"]:
                     # Create transaction object for internal transactions
                     timestamp = datetime.fromtimestamp(int(tx_data["timeStamp"]))
-                    value_eth = float(self.web3.from_wei(int(tx_data["value"]), 'ether'))
+                    value_eth = int(tx_data["value"]) / _WEI_PER_ETH
                     
                     # Determine transaction type
-                    if address.lower() == tx_data["from"].lower():
+                    if address_lower == tx_data["from"].lower():
                         tx_type = TransactionType.WITHDRAWAL
                     else:
                         tx_type = TransactionType.DEPOSIT
@@ -195,7 +318,11 @@ class EthereumClient:
                         raw_data=tx_data
                     )
                     
-                    transactions.append(transaction)
+                    batch.append(transaction)
+            
+            transactions.extend(batch)
+            if on_batch and batch:
+                on_batch(batch)
             
             # Sort transactions by timestamp
             transactions.sort(key=lambda t: t.timestamp)
@@ -205,3 +332,5 @@ class EthereumClient:
         except Exception as e:
             print(f"Error getting address transactions: {e}")
             return []
+        finally:
+            executor.shutdown(wait=False)
@@ -4,13 +4,19 @@ Command-line interface for the crypto transaction tracker.
 import argparse
 import sys
 from datetime import datetime
-from typing import List, Optional
+from typing import Any, Dict, List, Optional
 from tabulate import tabulate
 
 from src.main import CryptoTracker
 from src.models.transaction import Transaction
 
 
+def _format_timestamp(timestamp: datetime) -> str:
+    """Format a timestamp for display as YYYY-MM-DD HH:MM:SS."""
+    # isoformat is about twice as fast as strftime; the slice drops any UTC offset
+    return timestamp.isoformat(sep=" ", timespec="seconds")[:19]
+
+
 class CLI:
     """Command-line interface for the crypto transaction tracker."""
     
@@ -48,6 +54,7 @@ class CLI:
         # Show transaction chain
         chain_parser = subparsers.add_parser("chain", help="Show transaction chain")
         chain_parser.add_argument("id", help="Starting transaction ID")
+        chain_parser.add_argument("--max-depth", type=int, help="Only follow links up to this many hops away")
         
         # Link transactions
         link_parser = subparsers.add_parser("link", help="Link two transactions")
@@ -59,23 +66,41 @@ class CLI:
     
     def _format_transactions(self, transactions: List[Transaction]) -> str:
         """Format transactions for display."""
-        if not transactions:
+        return self._format_summaries([
+            {
+                "id": tx.id,
+                "timestamp": tx.timestamp,
+                "transaction_type": tx.transaction_type.value,
+                "source": tx.source.value,
+                "amount": tx.amount,
+                "currency": tx.currency,
+                "fee": tx.fee,
+                "fee_currency": tx.fee_currency,
+                "status": tx.status
+            }
+            for tx in transactions
+        ])
+    
+    def _format_summaries(self, summaries: List[Dict[str, Any]]) -> str:
+        """Format transaction summaries for display."""
+        if not summaries:
             return "No transactions found."
         
         table_data = []
-        for tx in transactions:
+        for tx in summaries:
             table_data.append([
-                tx.id[:8] + "...",  # Truncate ID for display
-                tx.timestamp.strftime("%Y-%m-%d %H:%M:%S"),
-                tx.transaction_type.value,
-                tx.source.value,
-                f"{tx.amount:.8f} {tx.currency}",
-                f"{tx.fee:.8f} {tx.fee_currency}" if tx.fee > 0 else "-",
-                tx.status
+                tx["id"][:8] + "...",  # Truncate ID for display
+                _format_timestamp(tx["timestamp"]),
+                tx["transaction_type"],
+                tx["source"],
+                f"{tx['amount']:.8f} {tx['currency']}",
+                f"{tx['fee']:.8f} {tx['fee_currency']}" if tx["fee"] and tx["fee"] > 0 else "-",
+                tx["status"]
             ])
         
         headers = ["ID", "Timestamp", "Type", "Source", "Amount", "Fee", "Status"]
-        return tabulate(table_data, headers=headers, tablefmt="grid")
+        # "simple" avoids the per-row separator lines "grid" draws for long listings
+        return tabulate(table_data, headers=headers, tablefmt="simple")
     
     def _format_transaction_details(self, transaction: Transaction) -> str:
         """Format transaction details for display."""
@@ -84,7 +109,7 @@ class CLI:
         
         details = [
             ["ID", transaction.id],
-            ["Timestamp", transaction.timestamp.strftime("%Y-%m-%d %H:%M:%S")],
+            ["Timestamp", _format_timestamp(transaction.timestamp)],
             ["Type", transaction.transaction_type.value],
             ["Source", transaction.source.value],
             ["Amount", f"{transaction.amount:.8f} {transaction.currency}"],
@@ -123,22 +148,15 @@ class CLI:
                 return 0
             
             elif args.command == "list":
-                transactions = self.tracker.get_transaction_history()
-                
-                # Apply filters
-                if args.currency:
-                    transactions = [tx for tx in transactions if tx.currency.lower() == args.currency.lower()]
-                
-                if args.type:
-                    transactions = [tx for tx in transactions if tx.transaction_type.value.lower() == args.type.lower()]
-                
-                if args.source:
-                    transactions = [tx for tx in transactions if tx.source.value.lower() == args.source.lower()]
-                
-                # Apply limit
-                transactions = transactions[:args.limit]
+                # Filters and limit are applied by the database query, which skips the JSON columns
+                summaries = self.tracker.get_transaction_summaries(
+                    currency=args.currency,
+                    transaction_type=args.type,
+                    source=args.source,
+                    limit=args.limit
+                )
                 
-                print(self._format_transactions(transactions))
+                print(self._format_summaries(summaries))
                 return 0
             
             elif args.command == "show":
@@ -147,7 +165,7 @@ class CLI:
                 return 0
             
             elif args.command == "chain":
-                chain = self.tracker.get_transaction_chain(args.id)
+                chain = self.tracker.get_transaction_chain(args.id, args.max_depth)
                 print(f"Transaction chain (length: {len(chain)}):")
                 print(self._format_transactions(chain))
                 return 0
@@ -2,36 +2,44 @@
 Coinbase exchange interface for the crypto transaction tracker.
 """
 import hmac
-import hashlib
 import time
 import json
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from datetime import datetime
-from typing import List, Dict, Any, Optional
+from typing import Callable, List, Dict, Any, Optional
 import uuid
-import requests
+import orjson
 
 from src.models.transaction import Transaction, TransactionType, TransactionSource
 from src.config.settings import COINBASE_API_KEY, COINBASE_API_SECRET
+from src.utils.http import create_session
 
 
 class CoinbaseClient:
     """Client for interacting with the Coinbase API."""
     
+    # Maximum number of concurrent account requests
+    MAX_WORKERS = 10
+    
+    # Largest page size accepted by the transactions endpoint
+    PAGE_LIMIT = 100
+    
+    # Path prefix of the API version included in pagination URIs
+    API_VERSION_PREFIX = "/v2"
+    
     def __init__(self, api_key: str = None, api_secret: str = None):
         """Initialize Coinbase client."""
         self.api_key = api_key or COINBASE_API_KEY
         self.api_secret = api_secret or COINBASE_API_SECRET
+        self._secret_bytes = self.api_secret.encode('utf-8')
         self.base_url = "https://api.coinbase.com/v2"
+        self._session = create_session()
     
     def _generate_signature(self, timestamp: str, method: str, request_path: str, body: str = "") -> str:
         """Generate signature for Coinbase API request."""
-        message = timestamp + method + request_path + body
-        signature = hmac.new(
-            self.api_secret.encode('utf-8'),
-            message.encode('utf-8'),
-            hashlib.sha256
-        ).hexdigest()
-        return signature
+        message = f"{timestamp}{method}{request_path}{body}"
+        # hmac.digest runs the whole HMAC in OpenSSL in a single call
+        return hmac.digest(self._secret_bytes, message.encode('utf-8'), 'sha256').hex()
     
     def _request(self, method: str, endpoint: str, params: Dict = None, data: Dict = None) -> Dict:
         """Make a request to the Coinbase API."""
@@ -55,7 +63,7 @@ class CoinbaseClient:
         signature = self._generate_signature(timestamp, method, endpoint, body)
         headers["CB-ACCESS-SIGN"] = signature
         
-        response = requests.request(
+        response = self._session.request(
             method=method,
             url=url,
             headers=headers,
@@ -64,7 +72,7 @@ class CoinbaseClient:
         )
         
         if response.status_code == 200:
-            return response.json()
+            return orjson.loads(response.content)
         else:
             print(f"Error: {response.status_code} - {response.text}")
             return {"data": []}
@@ -75,12 +83,25 @@ class CoinbaseClient:
         return response.get("data", [])
     
     def get_transactions(self, account_id: str) -> List[Transaction]:
-        """Get transactions for an account."""
-        endpoint = f"/accounts/{account_id}/transactions"
-        response = self._request("GET", endpoint)
+        """Get transactions for an account, following pagination."""
+        # The query string is part of the endpoint so it's covered by the request signature
+        endpoint = f"/accounts/{account_id}/transactions?limit={self.PAGE_LIMIT}"
+        
+        # Follow pagination so accounts with more than one page aren't truncated
+        tx_data_list = []
+        while endpoint:
+            response = self._request("GET", endpoint)
+            tx_data_list.extend(response.get("data", []))
+            
+            # next_uri carries the API version prefix and the query string for the next page
+            next_uri = (response.get("pagination") or {}).get("next_uri")
+            if next_uri and not next_uri.startswith(self.API_VERSION_PREFIX):
+                print(f"Unexpected pagination URI, stopping: {next_uri}")
+                next_uri = None
+            endpoint = next_uri[len(self.API_VERSION_PREFIX):] if next_uri else None
         
         transactions = []
-        for tx_data in response.get("data", []):
+        for tx_data in tx_data_list:
             # Map Coinbase transaction type to our transaction type
             tx_type_map = {
                 "buy": TransactionType.PURCHASE,
@@ -135,15 +156,23 @@ class CoinbaseClient:
         
         return transactions
     
-    def get_all_transactions(self) -> List[Transaction]:
-        """Get transactions for all accounts."""
+    def get_all_transactions(self, on_batch: Optional[Callable[[List[Transaction]], None]] = None) -> List[Transaction]:
+        """Get transactions for all accounts, passing each account's list to on_batch as it arrives."""
         accounts = self.get_accounts()
         all_transactions = []
         
-        for account in accounts:
-            account_id = account.get("id")
-            transactions = self.get_transactions(account_id)
-            all_transactions.extend(transactions)
+        if not accounts:
+            return all_transactions
+        
+        # Fetch accounts concurrently, bounded to stay under Coinbase rate limits
+        account_ids = [account.get("id") for account in accounts]
+        with ThreadPoolExecutor(max_workers=min(self.MAX_WORKERS, len(account_ids))) as executor:
+            futures = [executor.submit(self.get_transactions, account_id) for account_id in account_ids]
+            for future in as_completed(futures):
+                transactions = future.result()
+                all_transactions.extend(transactions)
+                if on_batch and transactions:
+                    on_batch(transactions)
         
         # Sort by timestamp
         all_transactions.sort(key=lambda t: t.timestamp)
@@ -2,15 +2,19 @@
 Main application for the crypto transaction tracker.
 """
 import os
+import queue
 import sys
-from typing import List, Dict, Any, Optional
+import threading
+from typing import List, Dict, Any, Optional, TYPE_CHECKING
 
-from src.blockchain.ethereum import EthereumClient
-from src.exchange.coinbase import CoinbaseClient
 from src.models.transaction import Transaction
 from src.utils.database import Database
 from src.config.settings import DATABASE_PATH
 
+if TYPE_CHECKING:
+    from src.blockchain.ethereum import EthereumClient
+    from src.exchange.coinbase import CoinbaseClient
+
 
 class CryptoTracker:
     """Main application class for tracking crypto transactions."""
@@ -18,40 +22,86 @@ class CryptoTracker:
     def __init__(self):
         """Initialize the crypto tracker."""
         self.db = Database(DATABASE_PATH)
-        self.eth_client = EthereumClient()
-        self.coinbase_client = CoinbaseClient()
+        self._eth_client = None
+        self._coinbase_client = None
+        
+        # Fetched batches are written by a background thread while fetching continues
+        self._write_queue: "queue.Queue[List[Transaction]]" = queue.Queue()
+        self._writer = threading.Thread(target=self._drain_writes, daemon=True)
+        self._writer.start()
+    
+    @property
+    def eth_client(self) -> "EthereumClient":
+        """Ethereum client, created on first use so web3 is only imported by commands that need it."""
+        if self._eth_client is None:
+            from src.blockchain.ethereum import EthereumClient
+            self._eth_client = EthereumClient()
+        return self._eth_client
+    
+    @property
+    def coinbase_client(self) -> "CoinbaseClient":
+        """Coinbase client, created on first use."""
+        if self._coinbase_client is None:
+            from src.exchange.coinbase import CoinbaseClient
+            self._coinbase_client = CoinbaseClient()
+        return self._coinbase_client
+    
+    def _drain_writes(self):
+        """Save queued transaction batches to the database."""
+        while True:
+            transactions = self._write_queue.get()
+            try:
+                self.db.save_transactions(transactions)
+            finally:
+                self._write_queue.task_done()
     
     def track_ethereum_address(self, address: str) -> List[Transaction]:
         """Track transactions for an Ethereum address."""
-        transactions = self.eth_client.get_address_transactions(address)
+        # Save each batch to the database as soon as it is fetched
+        transactions = self.eth_client.get_address_transactions(address, on_batch=self._write_queue.put)
         
-        # Save transactions to database
-        for tx in transactions:
-            self.db.save_transaction(tx)
+        # Wait until every batch has been written
+        self._write_queue.join()
         
         return transactions
     
     def track_coinbase_account(self) -> List[Transaction]:
         """Track transactions from Coinbase account."""
         try:
-            transactions = self.coinbase_client.get_all_transactions()
-            
-            # Save transactions to database
-            for tx in transactions:
-                self.db.save_transaction(tx)
+            # Save each account's transactions to the database as soon as they are fetched
+            transactions = self.coinbase_client.get_all_transactions(on_batch=self._write_queue.put)
             
             return transactions
         except ValueError as e:
             print(f"Error: {e}")
             return []
+        finally:
+            # Wait until every batch has been written
+            self._write_queue.join()
+    
+    def get_transaction_history(self, currency: Optional[str] = None, transaction_type: Optional[str] = None,
+                                source: Optional[str] = None, limit: Optional[int] = None) -> List[Transaction]:
+        """Get all tracked transactions, optionally filtered by currency, type and source and limited in number."""
+        return self.db.get_all_transactions(
+            currency=currency,
+            transaction_type=transaction_type,
+            source=source,
+            limit=limit
+        )
     
-    def get_transaction_history(self) -> List[Transaction]:
-        """Get all tracked transactions."""
-        return self.db.get_all_transactions()
+    def get_transaction_summaries(self, currency: Optional[str] = None, transaction_type: Optional[str] = None,
+                                  source: Optional[str] = None, limit: Optional[int] = None) -> List[Dict[str, Any]]:
+        """Get the scalar fields of tracked transactions for listings, without their raw data."""
+        return self.db.get_transactions_summary(
+            currency=currency,
+            transaction_type=transaction_type,
+            source=source,
+            limit=limit
+        )
     
-    def get_transaction_chain(self, transaction_id: str) -> List[Transaction]:
-        """Get a chain of related transactions."""
-        return self.db.get_transaction_chain(transaction_id)
+    def get_transaction_chain(self, transaction_id: str, max_depth: Optional[int] = None) -> List[Transaction]:
+        """Get a chain of related transactions, optionally only up to max_depth links away."""
+        return self.db.get_transaction_chain(transaction_id, max_depth)
     
     def link_transactions(self, parent_id: str, child_id: str, relationship_type: str = "continuation") -> bool:
         """Link two transactions as part of the same flow."""
@@ -27,7 +27,13 @@ class TransactionSource(Enum):
     MANUAL = "manual"
 
 
-@dataclass
+# Enum members by value, indexed directly instead of going through Enum.__call__
+_TYPE_MAP = {member.value: member for member in TransactionType}
+_SRC_MAP = {member.value: member for member in TransactionSource}
+
+
+# slots=True (Python 3.10+) drops the per-instance __dict__ to cut memory for large listings
+@dataclass(slots=True)
 class Transaction:
     """Base transaction model."""
     id: str
@@ -68,10 +74,35 @@ class Transaction:
             data["timestamp"] = datetime.fromisoformat(data["timestamp"])
         
         # Convert string enum values to enum types
+        # Unknown values raise ValueError, as calling the enum would
         if isinstance(data.get("transaction_type"), str):
-            data["transaction_type"] = TransactionType(data["transaction_type"])
+            if data["transaction_type"] not in _TYPE_MAP:
+                raise ValueError(f"{data['transaction_type']!r} is not a valid TransactionType")
+            data["transaction_type"] = _TYPE_MAP[data["transaction_type"]]
         
         if isinstance(data.get("source"), str):
-            data["source"] = TransactionSource(data["source"])
+            if data["source"] not in _SRC_MAP:
+                raise ValueError(f"{data['source']!r} is not a valid TransactionSource")
+            data["source"] = _SRC_MAP[data["source"]]
         
         return cls(**data)
+    
+    @classmethod
+    def _from_db_row(cls, id: str, timestamp: datetime, transaction_type: str, source: str, amount: float,
+                     currency: str, fee: float, fee_currency: str, status: str, notes: str,
+                     raw_data: Dict[str, Any], related_transactions: List[str]) -> 'Transaction':
+        """Create transaction from database column values with the timestamp and JSON fields already decoded."""
+        return cls(
+            id,
+            timestamp,
+            _TYPE_MAP[transaction_type],
+            _SRC_MAP[source],
+            amount,
+            currency,
+            fee,
+            fee_currency,
+            status,
+            notes,
+            raw_data,
+            related_transactions
+        )
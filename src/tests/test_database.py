@@ -0,0 +1,287 @@
+"""
+Tests for the database utilities of the crypto transaction tracker.
+"""
+import os
+import sqlite3
+import tempfile
+import threading
+import unittest
+from datetime import datetime, timedelta, timezone
+
+from src.models.transaction import Transaction, TransactionType, TransactionSource
+from src.utils.database import Database
+
+
+def make_transaction(index: int, **kwargs) -> Transaction:
+    """Create a test transaction whose timestamp increases with its index."""
+    return Transaction(
+        id=f"t{index}",
+        timestamp=datetime(2024, 1, 1) + timedelta(minutes=index),
+        transaction_type=TransactionType.DEPOSIT,
+        source=TransactionSource.BLOCKCHAIN,
+        amount=float(index),
+        currency="ETH",
+        raw_data={"index": index, "nested": {"values": [index]}},
+        **kwargs
+    )
+
+
+class DatabaseTestCase(unittest.TestCase):
+    """Base test case with a fresh database in a temporary directory."""
+    
+    def setUp(self):
+        """Create an empty database."""
+        self._tmpdir = tempfile.TemporaryDirectory()
+        self.db_path = os.path.join(self._tmpdir.name, "transactions.db")
+        self.db = Database(self.db_path)
+    
+    def tearDown(self):
+        """Close and remove the database."""
+        self.db.close()
+        self._tmpdir.cleanup()
+
+
+class TestTransactionCache(DatabaseTestCase):
+    """Tests for the transaction row cache."""
+    
+    def test_returned_transactions_do_not_share_cached_data(self):
+        """Mutating a returned transaction doesn't change later reads."""
+        self.db.save_transactions([make_transaction(1)])
+        
+        transaction = self.db.get_transaction("t1")
+        transaction.raw_data["nested"]["values"].append("mutated")
+        transaction.related_transactions.append("mutated")
+        self.db.get_transactions(["t1"])[0].raw_data["index"] = "mutated"
+        
+        transaction = self.db.get_transaction("t1")
+        self.assertEqual(transaction.raw_data, {"index": 1, "nested": {"values": [1]}})
+        self.assertEqual(transaction.related_transactions, [])
+    
+    def test_save_invalidates_cached_transaction(self):
+        """A saved transaction replaces the cached version."""
+        self.db.save_transactions([make_transaction(1)])
+        self.db.get_transaction("t1")
+        
+        updated = make_transaction(1)
+        updated.amount = 42.0
+        self.db.save_transaction(updated)
+        
+        self.assertEqual(self.db.get_transaction("t1").amount, 42.0)
+    
+    def test_read_racing_a_write_is_not_cached(self):
+        """A row read before a write isn't cached once the write has invalidated it."""
+        self.db.save_transactions([make_transaction(1)])
+        
+        # Simulate a reader that captured the generation and read the row before the write committed
+        generation = self.db._cache_generation
+        stale = self.db._conn.execute("SELECT * FROM transactions WHERE id = 't1'").fetchone()
+        
+        updated = make_transaction(1)
+        updated.amount = 42.0
+        self.db.save_transaction(updated)
+        
+        self.db._cache_rows([stale], generation)
+        self.assertNotIn("t1", self.db._cache)
+        self.assertEqual(self.db.get_transaction("t1").amount, 42.0)
+
+
+class TestTransactionChain(DatabaseTestCase):
+    """Tests for following links between transactions."""
+    
+    def setUp(self):
+        """Create a cycle t0 -> t1 -> t2 -> t0 with a tail t2 -> t3."""
+        super().setUp()
+        self.db.save_transactions([make_transaction(i) for i in range(5)])
+        for parent, child in [("t0", "t1"), ("t1", "t2"), ("t2", "t0"), ("t2", "t3")]:
+            self.assertTrue(self.db.link_transactions(parent, child, "continuation"))
+    
+    def chain_ids(self, transaction_id, max_depth=None):
+        """Get the ids of a chain."""
+        return [t.id for t in self.db.get_transaction_chain(transaction_id, max_depth)]
+    
+    def test_chain_is_ordered_by_timestamp(self):
+        """The chain includes every linked transaction, oldest first."""
+        self.assertEqual(self.chain_ids("t3"), ["t0", "t1", "t2", "t3"])
+        self.assertEqual(self.chain_ids("t4"), ["t4"])
+        self.assertEqual(self.chain_ids("missing"), [])
+    
+    def test_max_depth_limits_hops(self):
+        """max_depth bounds the number of links followed in either direction."""
+        self.assertEqual(self.chain_ids("t3", 0), ["t3"])
+        self.assertEqual(self.chain_ids("t3", 1), ["t2", "t3"])
+        self.assertEqual(self.chain_ids("t3", 2), ["t0", "t1", "t2", "t3"])
+    
+    def test_large_max_depth_on_cycle_is_fast(self):
+        """A huge max_depth on cyclic links costs no more than an unbounded walk."""
+        self.assertEqual(self.chain_ids("t0", 10_000_000), ["t0", "t1", "t2", "t3"])
+    
+    def test_small_max_depth_on_long_chain_reads_only_nearby_links(self):
+        """A capped walk runs one query per level and never walks the whole chain."""
+        self.db.save_transactions([make_transaction(i) for i in range(5, 1000)])
+        for index in range(4, 999):
+            self.assertTrue(self.db.link_transactions(f"t{index}", f"t{index + 1}", "continuation"))
+        
+        statements = []
+        for conn in self.db._pool._all:
+            conn.set_trace_callback(statements.append)
+        
+        self.assertEqual(self.chain_ids("t500", 2), ["t498", "t499", "t500", "t501", "t502"])
+        
+        link_queries = [sql for sql in statements if "transaction_links" in sql]
+        self.assertEqual(len(link_queries), 2)
+        self.assertFalse(any("WITH RECURSIVE" in sql for sql in statements))
+
+
+class TestConnectionPool(DatabaseTestCase):
+    """Tests for concurrent reads through the reader pool."""
+    
+    def test_open_iterators_do_not_block_reads(self):
+        """Partly consumed iterators don't use up the pooled connections."""
+        self.db.save_transactions([make_transaction(i) for i in range(3)])
+        
+        iterators = [self.db.iter_transactions() for _ in range(self.db.READ_POOL_SIZE + 1)]
+        for iterator in iterators:
+            next(iterator)
+        
+        results = []
+        reader = threading.Thread(target=lambda: results.append(self.db.get_transactions_summary()))
+        reader.start()
+        reader.join(timeout=5)
+        
+        self.assertFalse(reader.is_alive())
+        self.assertEqual(len(results[0]), 3)
+        self.assertEqual(self.db.get_transaction("t0").id, "t0")
+        
+        for iterator in iterators:
+            iterator.close()
+    
+    def test_concurrent_reads_and_writes(self):
+        """Readers and a writer running together see consistent, current data."""
+        self.db.save_transactions([make_transaction(i) for i in range(10)])
+        errors = []
+        
+        def read():
+            try:
+                for _ in range(100):
+                    self.db.get_transaction("t1")
+                    self.db.get_all_transactions(limit=5)
+                    self.db.get_transaction_chain("t1")
+            except Exception as e:
+                errors.append(e)
+        
+        def write():
+            try:
+                for amount in range(100):
+                    transaction = make_transaction(1)
+                    transaction.amount = float(amount)
+                    self.assertTrue(self.db.save_transaction(transaction))
+            except Exception as e:
+                errors.append(e)
+        
+        threads = [threading.Thread(target=read) for _ in range(self.db.READ_POOL_SIZE + 2)]
+        threads.append(threading.Thread(target=write))
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        
+        self.assertEqual(errors, [])
+        self.assertEqual(self.db.get_transaction("t1").amount, 99.0)
+    
+    def test_close_closes_borrowed_connections(self):
+        """Closing the database also closes connections that are still borrowed."""
+        with self.db._pool.read() as conn:
+            self.db.close()
+            with self.assertRaises(sqlite3.ProgrammingError):
+                conn.execute("SELECT 1")
+
+
+class TestTimestampMigration(unittest.TestCase):
+    """Tests for converting databases that store timestamps as ISO-8601 text."""
+    
+    def setUp(self):
+        """Create a database with the old TEXT timestamp schema, two transactions and a link."""
+        self._tmpdir = tempfile.TemporaryDirectory()
+        self.db_path = os.path.join(self._tmpdir.name, "legacy.db")
+        
+        conn = sqlite3.connect(self.db_path)
+        conn.executescript('''
+        CREATE TABLE transactions (
+            id TEXT PRIMARY KEY,
+            timestamp TEXT NOT NULL,
+            transaction_type TEXT NOT NULL,
+            source TEXT NOT NULL,
+            amount REAL NOT NULL,
+            currency TEXT NOT NULL,
+            fee REAL,
+            fee_currency TEXT,
+            status TEXT,
+            notes TEXT,
+            raw_data TEXT,
+            related_transactions TEXT
+        );
+        CREATE TABLE transaction_links (
+            parent_id TEXT,
+            child_id TEXT,
+            relationship_type TEXT,
+            PRIMARY KEY (parent_id, child_id),
+            FOREIGN KEY (parent_id) REFERENCES transactions(id),
+            FOREIGN KEY (child_id) REFERENCES transactions(id)
+        );
+        INSERT INTO transactions VALUES
+            ('a', '2024-01-01T12:00:00.123456', 'deposit', 'blockchain', 1.0, 'ETH', 0.0, 'ETH', 'confirmed', '', '{"x": 1}', '["b"]'),
+            ('b', '2024-01-02T00:00:00+00:00', 'sale', 'exchange', 2.0, 'BTC', 0.0, 'BTC', 'completed', '', '{}', '[]');
+        INSERT INTO transaction_links VALUES ('a', 'b', 'continuation');
+        ''')
+        conn.commit()
+        conn.close()
+        
+        self.db = Database(self.db_path)
+    
+    def tearDown(self):
+        """Close and remove the database."""
+        self.db.close()
+        self._tmpdir.cleanup()
+    
+    def test_timestamp_column_becomes_integer(self):
+        """The timestamp column is rebuilt as INTEGER epoch microseconds."""
+        self.assertEqual(self.db._timestamp_column_type(), "INTEGER")
+        
+        conn = sqlite3.connect(self.db_path)
+        try:
+            types = {row[0] for row in conn.execute("SELECT typeof(timestamp) FROM transactions")}
+            indexes = {row[0] for row in conn.execute("SELECT name FROM sqlite_master WHERE type = 'index'")}
+        finally:
+            conn.close()
+        
+        self.assertEqual(types, {"integer"})
+        self.assertIn("idx_tx_timestamp", indexes)
+    
+    def test_values_are_preserved(self):
+        """Timestamps convert to the same instants and other columns are untouched."""
+        transaction = self.db.get_transaction("a")
+        self.assertEqual(transaction.timestamp, datetime(2024, 1, 1, 12, 0, 0, 123456))
+        self.assertEqual(transaction.raw_data, {"x": 1})
+        self.assertEqual(transaction.related_transactions, ["b"])
+        
+        utc_timestamp = datetime(2024, 1, 2, tzinfo=timezone.utc)
+        self.assertEqual(self.db.get_transaction("b").timestamp, utc_timestamp.astimezone().replace(tzinfo=None))
+    
+    def test_links_survive(self):
+        """Links and foreign keys still work after the table is rebuilt."""
+        self.assertEqual([t.id for t in self.db.get_transaction_chain("b")], ["a", "b"])
+        self.assertEqual(self.db._conn.execute("PRAGMA foreign_key_check").fetchall(), [])
+        self.assertEqual(self.db._conn.execute("PRAGMA foreign_keys").fetchone()[0], 1)
+        
+        # Links to missing transactions are still rejected
+        self.assertFalse(self.db.link_transactions("a", "missing", "continuation"))
+    
+    def test_reopening_does_not_migrate_again(self):
+        """A converted database opens as-is."""
+        self.db.close()
+        self.db = Database(self.db_path)
+        self.assertEqual(self.db.get_transaction("a").timestamp, datetime(2024, 1, 1, 12, 0, 0, 123456))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -1,204 +1,540 @@
 """
 Database utilities for the crypto transaction tracker.
 """
-import json
+import queue
 import sqlite3
+import threading
+from collections import OrderedDict, deque
+from contextlib import contextmanager
 from datetime import datetime
-from typing import List, Dict, Any, Optional
+from typing import Callable, Iterable, Iterator, List, Dict, Any, Optional, Tuple
+
+import orjson
 
 from src.models.transaction import Transaction
 
+# Columns of the transactions table, in Transaction field order
+_COLS = (
+    "id, timestamp, transaction_type, source, amount, currency, "
+    "fee, fee_currency, status, notes, raw_data, related_transactions"
+)
+
+# Scalar columns needed to list transactions without their JSON payloads
+_SUMMARY_FIELDS = ("id", "timestamp", "transaction_type", "source", "amount", "currency", "fee", "fee_currency", "status")
+_SUMMARY_COLS = ", ".join(_SUMMARY_FIELDS)
+
+# Schema of the transactions table, formatted with the table name
+_CREATE_TRANSACTIONS = '''
+CREATE TABLE IF NOT EXISTS {table} (
+    id TEXT PRIMARY KEY,
+    timestamp INTEGER NOT NULL,
+    transaction_type TEXT NOT NULL,
+    source TEXT NOT NULL,
+    amount REAL NOT NULL,
+    currency TEXT NOT NULL,
+    fee REAL,
+    fee_currency TEXT,
+    status TEXT,
+    notes TEXT,
+    raw_data BLOB,
+    related_transactions TEXT
+)
+'''
+
+# Statements run on every save, read and link, kept as constants so sqlite3 reuses their compiled form.
+# Upserts update existing rows in place rather than deleting and reinserting them
+_SQL_INSERT_TX = f'''
+INSERT INTO transactions ({_COLS})
+VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+ON CONFLICT(id) DO UPDATE SET
+    timestamp = excluded.timestamp,
+    transaction_type = excluded.transaction_type,
+    source = excluded.source,
+    amount = excluded.amount,
+    currency = excluded.currency,
+    fee = excluded.fee,
+    fee_currency = excluded.fee_currency,
+    status = excluded.status,
+    notes = excluded.notes,
+    raw_data = excluded.raw_data,
+    related_transactions = excluded.related_transactions
+'''
+
+_SQL_SELECT_TX = f'SELECT {_COLS} FROM transactions WHERE id = ?'
+
+_SQL_INSERT_LINK = '''
+INSERT INTO transaction_links (parent_id, child_id, relationship_type)
+VALUES (?, ?, ?)
+ON CONFLICT(parent_id, child_id) DO UPDATE SET relationship_type = excluded.relationship_type
+'''
+
+# Append the child to the parent's related_transactions in SQL, without loading the parent
+_SQL_APPEND_RELATED = '''
+UPDATE transactions
+SET related_transactions = json_insert(related_transactions, '$[#]', ?)
+WHERE id = ? AND NOT EXISTS (
+    SELECT 1 FROM json_each(transactions.related_transactions) WHERE value = ?
+)
+'''
+
+# Collect the id of every transaction reachable through links in either direction in one query,
+# oldest first so the chain comes back in order
+_SQL_SELECT_CHAIN_IDS = '''
+WITH RECURSIVE reach(id) AS (
+    SELECT ?
+    UNION
+    SELECT l.child_id FROM transaction_links l JOIN reach ON l.parent_id = reach.id
+    UNION
+    SELECT l.parent_id FROM transaction_links l JOIN reach ON l.child_id = reach.id
+)
+SELECT id FROM transactions JOIN reach USING (id) ORDER BY timestamp
+'''
+
+# Ids linked to any id in a JSON array, in either direction; one query per level of a capped walk
+_SQL_SELECT_NEIGHBOR_IDS = '''
+SELECT child_id FROM transaction_links WHERE parent_id IN (SELECT value FROM json_each(?))
+UNION
+SELECT parent_id FROM transaction_links WHERE child_id IN (SELECT value FROM json_each(?))
+'''
+
+# Ids from a JSON array that exist as transactions, oldest first
+_SQL_ORDER_IDS = '''
+SELECT id FROM transactions WHERE id IN (SELECT value FROM json_each(?)) ORDER BY timestamp
+'''
+
+
+def _dumps(value: Any) -> bytes:
+    """Encode a value as JSON bytes, stored as a BLOB."""
+    return orjson.dumps(value)
+
+
+def _dumps_text(value: Any) -> str:
+    """Encode a value as JSON text, for columns SQLite's JSON functions operate on."""
+    return orjson.dumps(value).decode()
+
+
+def _loads(data: Any) -> Any:
+    """Decode JSON stored as either text or bytes."""
+    return orjson.loads(data)
+
+
+def _to_epoch_us(timestamp: datetime) -> int:
+    """Convert a datetime to integer microseconds since the Unix epoch."""
+    return round(timestamp.timestamp() * 1_000_000)
+
+
+def _from_epoch_us(timestamp: int) -> datetime:
+    """Convert epoch microseconds back to a naive datetime in local time."""
+    return datetime.fromtimestamp(timestamp / 1_000_000)
+
+
+def _iso_to_epoch_us(timestamp: str) -> int:
+    """Convert an ISO-8601 timestamp written by older versions to epoch microseconds."""
+    return _to_epoch_us(datetime.fromisoformat(timestamp))
+
+
+class _ConnectionPool:
+    """Fixed set of read connections, each handed to one thread at a time."""
+    
+    def __init__(self, connect: Callable[[], sqlite3.Connection], size: int):
+        """Open the pooled connections."""
+        self._all = [connect() for _ in range(size)]
+        self._connections: "queue.Queue[sqlite3.Connection]" = queue.Queue()
+        for conn in self._all:
+            self._connections.put(conn)
+    
+    @contextmanager
+    def read(self) -> Iterator[sqlite3.Connection]:
+        """Borrow a connection, waiting for one to be returned if all are in use."""
+        conn = self._connections.get()
+        try:
+            yield conn
+        finally:
+            self._connections.put(conn)
+    
+    def close(self):
+        """Close every pooled connection, including ones currently borrowed."""
+        for conn in self._all:
+            conn.close()
+
 
 class Database:
     """SQLite database manager for transaction storage."""
     
+    # Number of transaction rows kept in memory by get_transaction and get_transactions
+    CACHE_SIZE = 4096
+    
+    # Number of rows fetched at a time by iter_transactions
+    ITER_BATCH_SIZE = 500
+    
+    # Number of ids bound into each IN (...) query by get_transactions, below SQLite's variable limit
+    IN_BATCH_SIZE = 500
+    
+    # Compiled statements kept per connection, enough for every filter combination of listings
+    CACHED_STATEMENTS = 256
+    
+    # Number of read connections; WAL lets them read concurrently with each other and the writer
+    READ_POOL_SIZE = 4
+    
     def __init__(self, db_path: str):
-        """Initialize database connection."""
+        """Initialize database connections."""
         self.db_path = db_path
+        
+        # SQLite allows one writer at a time, so all writes share one connection serialized by the lock
+        self._conn = self._connect()
+        self._lock = threading.RLock()
+        
+        # Tune the writer for throughput: WAL with NORMAL sync only fsyncs at checkpoints
+        self._conn.executescript('''
+        PRAGMA journal_mode=WAL;
+        PRAGMA synchronous=NORMAL;
+        PRAGMA foreign_keys=ON;
+        ''')
+        
+        # Transaction rows by id, in least recently used order. Rows are cached still encoded and
+        # decoded on every read, so callers can't change cached data. The generation counts
+        # invalidations, so a read that raced a write doesn't cache the row it read before the write
+        self._cache: "OrderedDict[str, Tuple[Any, ...]]" = OrderedDict()
+        self._cache_lock = threading.Lock()
+        self._cache_generation = 0
+        
         self._create_tables()
+        
+        # Reads go through their own connections so they don't wait on the writer or each other
+        self._pool = _ConnectionPool(self._connect_reader, self.READ_POOL_SIZE)
     
-    def _create_tables(self):
-        """Create necessary tables if they don't exist."""
-        conn = sqlite3.connect(self.db_path)
-        cursor = conn.cursor()
-        
-        # Create transactions table
-        cursor.execute('''
-        CREATE TABLE IF NOT EXISTS transactions (
-            id TEXT PRIMARY KEY,
-            timestamp TEXT NOT NULL,
-            transaction_type TEXT NOT NULL,
-            source TEXT NOT NULL,
-            amount REAL NOT NULL,
-            currency TEXT NOT NULL,
-            fee REAL,
-            fee_currency TEXT,
-            status TEXT,
-            notes TEXT,
-            raw_data TEXT,
-            related_transactions TEXT
+    def _connect(self) -> sqlite3.Connection:
+        """Open a connection with the settings shared by the writer and readers."""
+        conn = sqlite3.connect(
+            self.db_path, check_same_thread=False, cached_statements=self.CACHED_STATEMENTS
         )
+        conn.executescript('''
+        PRAGMA temp_store=MEMORY;
+        PRAGMA mmap_size=268435456;
+        PRAGMA cache_size=-65536;
         ''')
+        return conn
+    
+    def _connect_reader(self) -> sqlite3.Connection:
+        """Open a connection for the read pool."""
+        conn = self._connect()
+        conn.execute('PRAGMA query_only=ON')
+        return conn
+    
+    def close(self):
+        """Close the database connections."""
+        with self._lock:
+            self._conn.close()
+        self._pool.close()
+    
+    def _create_tables(self):
+        """Create necessary tables if they don't exist."""
+        with self._lock:
+            cursor = self._conn.cursor()
+            
+            # Create transactions table; raw_data holds orjson bytes that SQLite never inspects,
+            # while related_transactions stays JSON text for json_insert and json_each.
+            # Timestamps are epoch microseconds so they sort as plain integers
+            cursor.execute(_CREATE_TRANSACTIONS.format(table='transactions'))
+            
+            # Databases created by older versions store timestamps as ISO-8601 text
+            if self._timestamp_column_type() == 'TEXT':
+                self._migrate_text_timestamps()
+            
+            # Create transaction links table for tracking related transactions
+            cursor.execute('''
+            CREATE TABLE IF NOT EXISTS transaction_links (
+                parent_id TEXT,
+                child_id TEXT,
+                relationship_type TEXT,
+                PRIMARY KEY (parent_id, child_id),
+                FOREIGN KEY (parent_id) REFERENCES transactions(id),
+                FOREIGN KEY (child_id) REFERENCES transactions(id)
+            )
+            ''')
+            
+            # Index child lookups; parent lookups are already covered by the primary key
+            cursor.execute('CREATE INDEX IF NOT EXISTS idx_links_child ON transaction_links(child_id)')
+            
+            # Index timestamps so listings are read in order instead of sorted
+            cursor.execute('CREATE INDEX IF NOT EXISTS idx_tx_timestamp ON transactions(timestamp)')
+            
+            self._conn.commit()
+    
+    def _timestamp_column_type(self) -> str:
+        """Get the declared type of the transactions.timestamp column."""
+        for _, name, column_type, *_ in self._conn.execute('PRAGMA table_info(transactions)'):
+            if name == 'timestamp':
+                return column_type.upper()
+        return ''
+    
+    def _migrate_text_timestamps(self):
+        """Rebuild the transactions table with ISO-8601 timestamps converted to epoch microseconds."""
+        self._conn.create_function('iso_to_epoch_us', 1, _iso_to_epoch_us, deterministic=True)
         
-        # Create transaction links table for tracking related transactions
-        cursor.execute('''
-        CREATE TABLE IF NOT EXISTS transaction_links (
-            parent_id TEXT,
-            child_id TEXT,
-            relationship_type TEXT,
-            PRIMARY KEY (parent_id, child_id),
-            FOREIGN KEY (parent_id) REFERENCES transactions(id),
-            FOREIGN KEY (child_id) REFERENCES transactions(id)
-        )
+        # SQLite can't change a column's type in place; foreign keys are off so links survive the swap
+        self._conn.commit()
+        self._conn.executescript(f'''
+        PRAGMA foreign_keys=OFF;
+        BEGIN;
+        {_CREATE_TRANSACTIONS.format(table='transactions_migrated')};
+        INSERT INTO transactions_migrated ({_COLS})
+        SELECT id, iso_to_epoch_us(timestamp), transaction_type, source, amount, currency,
+               fee, fee_currency, status, notes, raw_data, related_transactions
+        FROM transactions;
+        DROP TABLE transactions;
+        ALTER TABLE transactions_migrated RENAME TO transactions;
+        COMMIT;
+        PRAGMA foreign_keys=ON;
         ''')
-        
-        conn.commit()
-        conn.close()
     
     def save_transaction(self, transaction: Transaction) -> bool:
         """Save a transaction to the database."""
-        conn = sqlite3.connect(self.db_path)
-        cursor = conn.cursor()
-        
-        try:
-            cursor.execute('''
-            INSERT OR REPLACE INTO transactions (
-                id, timestamp, transaction_type, source, amount, currency,
-                fee, fee_currency, status, notes, raw_data, related_transactions
-            ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
-            ''', (
-                transaction.id,
-                transaction.timestamp.isoformat(),
-                transaction.transaction_type.value,
-                transaction.source.value,
-                transaction.amount,
-                transaction.currency,
-                transaction.fee,
-                transaction.fee_currency,
-                transaction.status,
-                transaction.notes,
-                json.dumps(transaction.raw_data),
-                json.dumps(transaction.related_transactions)
-            ))
+        return self.save_transactions([transaction])
+    
+    def save_transactions(self, transactions: List[Transaction]) -> bool:
+        """Save multiple transactions to the database in a single commit."""
+        with self._lock:
+            cursor = self._conn.cursor()
             
-            conn.commit()
-            return True
-        except Exception as e:
-            print(f"Error saving transaction: {e}")
-            return False
-        finally:
-            conn.close()
+            try:
+                # Rows are encoded lazily as executemany consumes them
+                cursor.executemany(_SQL_INSERT_TX, (
+                    (
+                        transaction.id,
+                        _to_epoch_us(transaction.timestamp),
+                        transaction.transaction_type.value,
+                        transaction.source.value,
+                        transaction.amount,
+                        transaction.currency,
+                        transaction.fee,
+                        transaction.fee_currency,
+                        transaction.status,
+                        transaction.notes,
+                        _dumps(transaction.raw_data),
+                        _dumps_text(transaction.related_transactions)
+                    )
+                    for transaction in transactions
+                ))
+                
+                self._conn.commit()
+                return True
+            except Exception as e:
+                self._conn.rollback()
+                print(f"Error saving transactions: {e}")
+                return False
+            finally:
+                self._invalidate_cached(transaction.id for transaction in transactions)
     
     def get_transaction(self, transaction_id: str) -> Optional[Transaction]:
         """Get a transaction by ID."""
-        conn = sqlite3.connect(self.db_path)
-        conn.row_factory = sqlite3.Row
-        cursor = conn.cursor()
+        with self._cache_lock:
+            row = self._cache.get(transaction_id)
+            if row is not None:
+                self._cache.move_to_end(transaction_id)
+            generation = self._cache_generation
         
-        cursor.execute('SELECT * FROM transactions WHERE id = ?', (transaction_id,))
-        row = cursor.fetchone()
-        conn.close()
-        
-        if not row:
-            return None
-        
-        # Convert row to dict
-        data = dict(row)
-        data['raw_data'] = json.loads(data['raw_data'])
-        data['related_transactions'] = json.loads(data['related_transactions'])
+        if row is None:
+            with self._pool.read() as conn:
+                cursor = conn.cursor()
+                cursor.execute(_SQL_SELECT_TX, (transaction_id,))
+                row = cursor.fetchone()
+            
+            if not row:
+                return None
+            
+            self._cache_rows([row], generation)
         
-        return Transaction.from_dict(data)
+        return self._row_to_transaction(row)
     
-    def get_all_transactions(self) -> List[Transaction]:
-        """Get all transactions."""
-        conn = sqlite3.connect(self.db_path)
-        conn.row_factory = sqlite3.Row
-        cursor = conn.cursor()
+    def get_transactions(self, transaction_ids: List[str]) -> List[Transaction]:
+        """Get several transactions by ID in the given order, skipping IDs that don't exist."""
+        found: Dict[str, Tuple[Any, ...]] = {}
+        transaction_ids = list(dict.fromkeys(transaction_ids))
+        
+        missing = []
+        with self._cache_lock:
+            for transaction_id in transaction_ids:
+                row = self._cache.get(transaction_id)
+                if row is None:
+                    missing.append(transaction_id)
+                else:
+                    self._cache.move_to_end(transaction_id)
+                    found[transaction_id] = row
+            generation = self._cache_generation
         
-        cursor.execute('SELECT * FROM transactions ORDER BY timestamp DESC')
-        rows = cursor.fetchall()
-        conn.close()
+        # Hydrate cache misses with one IN query per batch instead of one lookup per id
+        rows = []
+        if missing:
+            with self._pool.read() as conn:
+                cursor = conn.cursor()
+                for start in range(0, len(missing), self.IN_BATCH_SIZE):
+                    batch = missing[start:start + self.IN_BATCH_SIZE]
+                    placeholders = ','.join('?' * len(batch))
+                    cursor.execute(f'SELECT {_COLS} FROM transactions WHERE id IN ({placeholders})', batch)
+                    rows.extend(cursor.fetchall())
         
-        transactions = []
+        self._cache_rows(rows, generation)
         for row in rows:
-            data = dict(row)
-            data['raw_data'] = json.loads(data['raw_data'])
-            data['related_transactions'] = json.loads(data['related_transactions'])
-            transactions.append(Transaction.from_dict(data))
+            found[row[0]] = row
         
-        return transactions
+        return [self._row_to_transaction(found[transaction_id]) for transaction_id in transaction_ids if transaction_id in found]
     
-    def link_transactions(self, parent_id: str, child_id: str, relationship_type: str) -> bool:
-        """Link two transactions together."""
-        conn = sqlite3.connect(self.db_path)
-        cursor = conn.cursor()
+    def _cache_rows(self, rows: List[Tuple[Any, ...]], generation: int):
+        """Cache rows read at the given generation, unless a write has invalidated entries since."""
+        with self._cache_lock:
+            if generation != self._cache_generation:
+                return
+            
+            for row in rows:
+                self._cache[row[0]] = row
+                if len(self._cache) > self.CACHE_SIZE:
+                    self._cache.popitem(last=False)
+    
+    def _invalidate_cached(self, transaction_ids: Iterable[str]):
+        """Drop transactions from the cache after they were written."""
+        with self._cache_lock:
+            self._cache_generation += 1
+            for transaction_id in transaction_ids:
+                self._cache.pop(transaction_id, None)
+    
+    def get_all_transactions(self, currency: Optional[str] = None, transaction_type: Optional[str] = None,
+                             source: Optional[str] = None, limit: Optional[int] = None) -> List[Transaction]:
+        """Get all transactions, optionally filtered by currency, type and source (case-insensitive) and limited to the most recent."""
+        query, params = self._listing_query(_COLS, currency, transaction_type, source, limit)
+        
+        with self._pool.read() as conn:
+            cursor = conn.cursor()
+            cursor.execute(query, params)
+            rows = cursor.fetchall()
+        
+        return [self._row_to_transaction(row) for row in rows]
+    
+    def iter_transactions(self, currency: Optional[str] = None, transaction_type: Optional[str] = None,
+                          source: Optional[str] = None, limit: Optional[int] = None) -> Iterator[Transaction]:
+        """Iterate over transactions like get_all_transactions, decoding rows in batches instead of all at once."""
+        query, params = self._listing_query(_COLS, currency, transaction_type, source, limit)
         
+        # The caller decides how long the iterator stays open, so it reads through its own
+        # connection instead of holding one of the pooled ones across yields
+        conn = self._connect_reader()
         try:
-            cursor.execute('''
-            INSERT OR REPLACE INTO transaction_links (parent_id, child_id, relationship_type)
-            VALUES (?, ?, ?)
-            ''', (parent_id, child_id, relationship_type))
-            
-            # Update related_transactions field in parent transaction
-            parent = self.get_transaction(parent_id)
-            if parent and child_id not in parent.related_transactions:
-                parent.related_transactions.append(child_id)
-                self.save_transaction(parent)
+            cursor = conn.cursor()
+            cursor.execute(query, params)
             
-            conn.commit()
-            return True
-        except Exception as e:
-            print(f"Error linking transactions: {e}")
-            return False
+            while True:
+                rows = cursor.fetchmany(self.ITER_BATCH_SIZE)
+                if not rows:
+                    break
+                
+                for row in rows:
+                    yield self._row_to_transaction(row)
         finally:
             conn.close()
     
-    def get_transaction_chain(self, transaction_id: str) -> List[Transaction]:
-        """Get a chain of related transactions starting from the given transaction ID."""
-        # Get the initial transaction
-        transaction = self.get_transaction(transaction_id)
-        if not transaction:
-            return []
-        
-        # Initialize the chain with the starting transaction
-        chain = [transaction]
-        visited = {transaction_id}
+    def get_transactions_summary(self, currency: Optional[str] = None, transaction_type: Optional[str] = None,
+                                 source: Optional[str] = None, limit: Optional[int] = None) -> List[Dict[str, Any]]:
+        """Get the scalar fields of transactions as dicts, skipping raw_data and related_transactions."""
+        query, params = self._listing_query(_SUMMARY_COLS, currency, transaction_type, source, limit)
         
-        # Get all related transactions recursively
-        self._get_related_transactions(transaction_id, chain, visited)
+        with self._pool.read() as conn:
+            cursor = conn.cursor()
+            cursor.execute(query, params)
+            rows = cursor.fetchall()
         
-        # Sort by timestamp
-        chain.sort(key=lambda t: t.timestamp)
+        summaries = []
+        for row in rows:
+            summary = dict(zip(_SUMMARY_FIELDS, row))
+            summary['timestamp'] = _from_epoch_us(summary['timestamp'])
+            summaries.append(summary)
         
-        return chain
+        return summaries
     
-    def _get_related_transactions(self, transaction_id: str, chain: List[Transaction], visited: set):
-        """Recursively get related transactions."""
-        conn = sqlite3.connect(self.db_path)
-        conn.row_factory = sqlite3.Row
-        cursor = conn.cursor()
+    def _listing_query(self, columns: str, currency: Optional[str], transaction_type: Optional[str],
+                       source: Optional[str], limit: Optional[int]) -> Tuple[str, List[Any]]:
+        """Build a filtered, newest-first query over the transactions table."""
+        conditions = []
+        params = []
         
-        # Get child transactions
-        cursor.execute('''
-        SELECT child_id FROM transaction_links WHERE parent_id = ?
-        ''', (transaction_id,))
+        if currency:
+            conditions.append('lower(currency) = lower(?)')
+            params.append(currency)
         
-        child_ids = [row['child_id'] for row in cursor.fetchall()]
+        if transaction_type:
+            conditions.append('lower(transaction_type) = lower(?)')
+            params.append(transaction_type)
         
-        # Get parent transactions
-        cursor.execute('''
-        SELECT parent_id FROM transaction_links WHERE child_id = ?
-        ''', (transaction_id,))
+        if source:
+            conditions.append('lower(source) = lower(?)')
+            params.append(source)
         
-        parent_ids = [row['parent_id'] for row in cursor.fetchall()]
+        query = f'SELECT {columns} FROM transactions'
+        if conditions:
+            query += ' WHERE ' + ' AND '.join(conditions)
+        query += ' ORDER BY timestamp DESC'
         
-        conn.close()
+        if limit is not None:
+            query += ' LIMIT ?'
+            params.append(limit)
+        
+        return query, params
+    
+    def _row_to_transaction(self, row: Tuple[Any, ...]) -> Transaction:
+        """Convert a transactions table row to a Transaction."""
+        (transaction_id, timestamp, transaction_type, source, amount, currency,
+         fee, fee_currency, status, notes, raw_data, related_transactions) = row
+        
+        return Transaction._from_db_row(
+            transaction_id, _from_epoch_us(timestamp), transaction_type, source, amount, currency,
+            fee, fee_currency, status, notes, _loads(raw_data), _loads(related_transactions)
+        )
+    
+    def link_transactions(self, parent_id: str, child_id: str, relationship_type: str) -> bool:
+        """Link two transactions together."""
+        with self._lock:
+            cursor = self._conn.cursor()
+            
+            try:
+                cursor.execute(_SQL_INSERT_LINK, (parent_id, child_id, relationship_type))
+                cursor.execute(_SQL_APPEND_RELATED, (child_id, parent_id, child_id))
+                
+                self._conn.commit()
+                return True
+            except Exception as e:
+                self._conn.rollback()
+                print(f"Error linking transactions: {e}")
+                return False
+            finally:
+                self._invalidate_cached([parent_id])
+    
+    def get_transaction_chain(self, transaction_id: str, max_depth: Optional[int] = None) -> List[Transaction]:
+        """Get a chain of related transactions starting from the given transaction ID, up to max_depth links away."""
+        with self._pool.read() as conn:
+            cursor = conn.cursor()
+            if max_depth is None:
+                cursor.execute(_SQL_SELECT_CHAIN_IDS, (transaction_id,))
+            else:
+                # Walk one level of links per query so the work stays bounded by max_depth
+                visited = {transaction_id}
+                frontier = deque([transaction_id])
+                depth = 0
+                while frontier and depth < max_depth:
+                    level = _dumps_text(list(frontier))
+                    frontier.clear()
+                    
+                    cursor.execute(_SQL_SELECT_NEIGHBOR_IDS, (level, level))
+                    for (neighbor_id,) in cursor.fetchall():
+                        if neighbor_id not in visited:
+                            visited.add(neighbor_id)
+                            frontier.append(neighbor_id)
+                    depth += 1
+                
+                cursor.execute(_SQL_ORDER_IDS, (_dumps_text(list(visited)),))
+            chain_ids = [row[0] for row in cursor.fetchall()]
+        
+        # The starting transaction must exist for there to be a chain
+        if transaction_id not in chain_ids:
+            return []
         
-        # Process all related transactions
-        for related_id in child_ids + parent_ids:
-            if related_id not in visited:
-                visited.add(related_id)
-                related_tx = self.get_transaction(related_id)
-                if related_tx:
-                    chain.append(related_tx)
-                    self._get_related_transactions(related_id, chain, visited)
+        # get_transactions keeps the timestamp order of the ids
+        return self.get_transactions(chain_ids)
@@ -0,0 +1,23 @@
+"""
+HTTP utilities for the crypto transaction tracker.
+"""
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+
+def create_session() -> requests.Session:
+    """Create an HTTP session with connection pooling and retries."""
+    session = requests.Session()
+    
+    # Retry transient failures with backoff, returning the last response once retries run out
+    retry = Retry(
+        total=3,
+        backoff_factor=0.3,
+        status_forcelist=[429, 500, 502, 503, 504],
+        raise_on_status=False
+    )
+    adapter = HTTPAdapter(pool_connections=10, pool_maxsize=20, max_retries=retry)
+    session.mount("https://", adapter)
+    
+    return session